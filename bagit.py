@@ -16,7 +16,8 @@ import unicodedata
 import warnings
 from collections import defaultdict
 from datetime import date
-from functools import partial
+from functools import lru_cache, partial
+from multiprocessing.pool import ThreadPool
 
 try:
     from importlib.metadata import version
@@ -130,6 +131,10 @@ DEFAULT_CHECKSUMS = ["sha256", "sha512"]
 #: Block size used when reading files for hashing:
 HASH_BLOCK_SIZE = 512 * 1024
 
+#: Buffer size used when reading or writing manifests and other tag files,
+#: which can contain millions of lines for large bags:
+TAG_FILE_BUFFER_SIZE = 1024 * 1024
+
 #: Convenience function used everywhere we want to open a file to read text
 #: rather than undecoded bytes:
 open_text_file = partial(codecs.open, encoding="utf-8", errors="strict")
@@ -137,6 +142,13 @@ open_text_file = partial(codecs.open, encoding="utf-8", errors="strict")
 # This is the same as decoding the byte values in codecs.BOM:
 UNICODE_BYTE_ORDER_MARK = "\ufeff"
 
+#: os.fwalk and stat() relative to a directory descriptor are only available
+#: on some platforms:
+HAVE_FWALK = hasattr(os, "fwalk") and os.stat in os.supports_dir_fd
+
+#: Matches manifest and tagmanifest filenames, capturing the algorithm name:
+MANIFEST_FILENAME_RE = re.compile(r"^(tag)?manifest-(.+)\.txt$")
+
 
 def make_bag(
     bag_dir, bag_info=None, processes=1, checksums=None, checksum=None, encoding="utf-8"
@@ -145,6 +157,10 @@ def make_bag(
     Convert a given directory into a bag. You can pass in arbitrary
     key/value pairs to put into the bag-info.txt metadata file as
     the bag_info dictionary.
+
+    processes sets the number of threads used to hash the payload. hashlib
+    only releases the GIL when updating a hash with more than about 2 KiB,
+    so a payload made up of small files is still hashed mostly in series.
     """
 
     if checksum is not None:
@@ -250,7 +266,7 @@ def make_bag(
 
             # allow 'Bagging-Date' and 'Bag-Software-Agent' to be overidden
             if "Bagging-Date" not in bag_info:
-                bag_info["Bagging-Date"] = date.strftime(date.today(), "%Y-%m-%d")
+                bag_info["Bagging-Date"] = date.today().isoformat()
             if "Bag-Software-Agent" not in bag_info:
                 bag_info["Bag-Software-Agent"] = "bagit.py v%s <%s>" % (
                     VERSION,
@@ -260,8 +276,7 @@ def make_bag(
             bag_info["Payload-Oxum"] = "%s.%s" % (total_bytes, total_files)
             _make_tag_file("bag-info.txt", bag_info)
 
-            for c in checksums:
-                _make_tagmanifest_file(c, bag_dir, encoding="utf-8")
+            _make_tagmanifest_files(checksums, bag_dir, encoding="utf-8")
     except Exception:
         LOGGER.exception(_("An error occurred creating a bag in %s"), bag_dir)
         raise
@@ -428,16 +443,39 @@ class Bag(object):
 
         for dirpath, _, filenames in os.walk(payload_dir):
             for f in filenames:
-                # Jump through some hoops here to make the payload files are
-                # returned with the directory structure relative to the base
-                # directory rather than the
-                normalized_f = os.path.normpath(f)
-                rel_path = os.path.relpath(
-                    os.path.join(dirpath, normalized_f), start=self.path
-                )
+                yield self._payload_rel_path(dirpath, f)
+
+    def _payload_files_with_sizes(self):
+        """
+        Yields (filename, size) tuples for the files present on the local
+        filesystem, as payload_files() would list them.
+
+        Where the platform supports it, we walk the payload with os.fwalk so
+        each file can be stat()-ed relative to an open directory descriptor
+        rather than having the kernel resolve its full path every time.
+        """
+        payload_dir = os.path.join(self.path, "data")
+
+        if HAVE_FWALK:
+            for dirpath, _, filenames, dir_fd in os.fwalk(payload_dir):
+                for f in filenames:
+                    rel_path = self._payload_rel_path(dirpath, f)
+                    yield rel_path, os.stat(f, dir_fd=dir_fd).st_size
+        else:
+            for dirpath, _, filenames in os.walk(payload_dir):
+                for f in filenames:
+                    rel_path = self._payload_rel_path(dirpath, f)
+                    yield rel_path, os.stat(os.path.join(dirpath, f)).st_size
+
+    def _payload_rel_path(self, dirpath, filename):
+        # Jump through some hoops here to make the payload files are
+        # returned with the directory structure relative to the base
+        # directory rather than the
+        normalized_f = os.path.normpath(filename)
+        rel_path = os.path.relpath(os.path.join(dirpath, normalized_f), start=self.path)
 
-                self.normalized_filesystem_names[normalize_unicode(rel_path)] = rel_path
-                yield rel_path
+        self.normalized_filesystem_names[normalize_unicode(rel_path)] = rel_path
+        return rel_path
 
     def payload_entries(self):
         """Return a dictionary of items"""
@@ -460,7 +498,9 @@ class Bag(object):
         a corrupted bag.
 
         If you want to control the number of processes that are used when
-        recalculating checksums use the processes parameter.
+        recalculating checksums use the processes parameter. As with
+        make_bag(), these are threads, which only hash small files in
+        parallel to a limited extent.
         """
         # Error checking
         if not self.path:
@@ -515,8 +555,7 @@ class Bag(object):
         _make_tag_file(self.tag_file_name, self.info)
 
         # Update tag-manifest for changes to manifest & bag-info files
-        for alg in self.algorithms:
-            _make_tagmanifest_file(alg, self.path, encoding=self.encoding)
+        _make_tagmanifest_files(self.algorithms, self.path, encoding=self.encoding)
 
         # Reload the manifests
         self._load_manifests()
@@ -554,13 +593,18 @@ class Bag(object):
         fetch_file_path = os.path.join(self.path, "fetch.txt")
 
         if os.path.isfile(fetch_file_path):
+            bag_path = self._real_bag_path()
+
             with open_text_file(
-                fetch_file_path, "r", encoding=self.encoding
+                fetch_file_path,
+                "r",
+                encoding=self.encoding,
+                buffering=TAG_FILE_BUFFER_SIZE,
             ) as fetch_file:
                 for line in fetch_file:
                     url, file_size, filename = line.strip().split(None, 2)
 
-                    if self._path_is_dangerous(filename):
+                    if self._path_is_dangerous(filename, bag_path=bag_path):
                         raise BagError(
                             _('Path "%(payload_file)s" in "%(source_file)s" is unsafe')
                             % {
@@ -583,13 +627,19 @@ class Bag(object):
     def has_oxum(self):
         return "Payload-Oxum" in self.info
 
-    def validate(self, processes=1, fast=False, completeness_only=False):
+    def validate(
+        self, processes=1, fast=False, completeness_only=False, fast_fail=False
+    ):
         """Checks the structure and contents are valid.
 
         If you supply the parameter fast=True the Payload-Oxum (if present) will
         be used to check that the payload files are present and accounted for,
         instead of re-calculating fixities and comparing them against the
         manifest. By default validate() will re-calculate fixities (fast=False).
+
+        If you supply the parameter fast_fail=True fixity checking will stop at
+        the first file which does not match the manifest, so the exception's
+        details will only list that file's errors.
         """
 
         self._validate_structure()
@@ -598,7 +648,10 @@ class Bag(object):
         self.validate_fetch()
 
         self._validate_contents(
-            processes=processes, fast=fast, completeness_only=completeness_only
+            processes=processes,
+            fast=fast,
+            completeness_only=completeness_only,
+            fast_fail=fast_fail,
         )
 
         return True
@@ -606,11 +659,17 @@ class Bag(object):
     def is_valid(self, processes=1, fast=False, completeness_only=False):
         """Returns validation success or failure as boolean.
         Optional processes and fast parameters passed directly to validate().
+
+        Since the details are discarded, validation stops at the first file
+        which does not match the manifest.
         """
 
         try:
             self.validate(
-                processes=processes, fast=fast, completeness_only=completeness_only
+                processes=processes,
+                fast=fast,
+                completeness_only=completeness_only,
+                fast_fail=True,
             )
         except BagError:
             return False
@@ -625,21 +684,19 @@ class Bag(object):
             # v0.97+ requires that optional tagfiles are verified.
             manifests += list(self.tagmanifest_files())
 
+        bag_path = self._real_bag_path()
+
         for manifest_filename in manifests:
-            if manifest_filename.find("tagmanifest-") != -1:
-                search = "tagmanifest-"
-            else:
-                search = "manifest-"
-            alg = (
-                os.path.basename(manifest_filename)
-                .replace(search, "")
-                .replace(".txt", "")
-            )
+            match = MANIFEST_FILENAME_RE.match(os.path.basename(manifest_filename))
+            alg = match.group(2)
             if alg not in self.algorithms:
                 self.algorithms.append(alg)
 
             with open_text_file(
-                manifest_filename, "r", encoding=self.encoding
+                manifest_filename,
+                "r",
+                encoding=self.encoding,
+                buffering=TAG_FILE_BUFFER_SIZE,
             ) as manifest_file:
                 if manifest_file.encoding.startswith("UTF"):
                     # We'll check the first character to see if it's a BOM:
@@ -683,7 +740,7 @@ class Bag(object):
                     entry_path = os.path.normpath(entry[1].lstrip("*"))
                     entry_path = _decode_filename(entry_path)
 
-                    if self._path_is_dangerous(entry_path):
+                    if self._path_is_dangerous(entry_path, bag_path=bag_path):
                         raise BagError(
                             _(
                                 'Path "%(payload_file)s" in manifest "%(manifest_file)s" is unsafe'
@@ -775,7 +832,9 @@ class Bag(object):
             ):
                 raise BagError(_("Malformed URL in fetch.txt: %s") % url)
 
-    def _validate_contents(self, processes=1, fast=False, completeness_only=False):
+    def _validate_contents(
+        self, processes=1, fast=False, completeness_only=False, fast_fail=False
+    ):
         if fast and not self.has_oxum():
             raise BagValidationError(
                 _("Fast validation requires bag-info.txt to include Payload-Oxum")
@@ -792,7 +851,7 @@ class Bag(object):
         if completeness_only:
             return
 
-        self._validate_entries(processes)
+        self._validate_entries(processes, fast_fail=fast_fail)
 
     def _validate_oxum(self):
         oxum = self.info.get("Payload-Oxum")
@@ -816,18 +875,30 @@ class Bag(object):
         total_bytes = 0
         total_files = 0
 
-        for payload_file in self.payload_files():
-            payload_file = os.path.join(self.path, payload_file)
-            total_bytes += os.stat(payload_file).st_size
+        for _payload_file, file_size in self._payload_files_with_sizes():
+            total_bytes += file_size
             total_files += 1
 
-        if oxum_file_count != total_files or oxum_byte_count != total_bytes:
-            raise BagValidationError(
-                _(
+            # Once either total exceeds the Payload-Oxum the bag cannot be
+            # valid so there's no need to stat the rest of the payload:
+            if total_files > oxum_file_count or total_bytes > oxum_byte_count:
+                msg = _(
                     "Payload-Oxum validation failed."
                     " Expected %(oxum_file_count)d files and %(oxum_byte_count)d bytes"
-                    " but found %(found_file_count)d files and %(found_byte_count)d bytes"
+                    " but found at least %(found_file_count)d files and"
+                    " %(found_byte_count)d bytes"
                 )
+                break
+        else:
+            msg = _(
+                "Payload-Oxum validation failed."
+                " Expected %(oxum_file_count)d files and %(oxum_byte_count)d bytes"
+                " but found %(found_file_count)d files and %(found_byte_count)d bytes"
+            )
+
+        if oxum_file_count != total_files or oxum_byte_count != total_bytes:
+            raise BagValidationError(
+                msg
                 % {
                     "found_file_count": total_files,
                     "found_byte_count": total_bytes,
@@ -857,7 +928,7 @@ class Bag(object):
         if errors:
             raise BagValidationError(_("Bag is incomplete"), errors)
 
-    def _validate_entries(self, processes):
+    def _validate_entries(self, processes, fast_fail=False):
         """
         Verify that the actual file contents match the recorded hashes stored in the manifest files
         """
@@ -878,31 +949,53 @@ class Bag(object):
             for rel_path, hashes in self.entries.items()
         )
 
+        pool = None
+
         try:
             if processes == 1:
-                hash_results = [_calc_hashes(i) for i in args]
+                # This is lazy so that fast_fail can stop hashing early:
+                hash_results = map(_calc_hashes, args)
             else:
                 pool = multiprocessing.Pool(
                     processes if processes else None, initializer=worker_init
                 )
-                hash_results = pool.map(_calc_hashes, args)
-                pool.close()
-                pool.join()
+                if fast_fail:
+                    # Hand out files in batches the size Pool.map() would use
+                    # since one task per file costs more in IPC than hashing
+                    # small files:
+                    chunksize, extra = divmod(
+                        len(self.entries), (processes or os.cpu_count() or 1) * 4
+                    )
+                    hash_results = pool.imap_unordered(
+                        _calc_hashes, args, chunksize=chunksize + bool(extra)
+                    )
+                else:
+                    hash_results = pool.map(_calc_hashes, args)
+
+            for rel_path, f_hashes, hashes in hash_results:
+                for alg, computed_hash in f_hashes.items():
+                    stored_hash = hashes[alg]
+                    if stored_hash.lower() != computed_hash:
+                        e = ChecksumMismatch(
+                            rel_path, alg, stored_hash.lower(), computed_hash
+                        )
+                        LOGGER.warning(str(e))
+                        errors.append(e)
+
+                if errors and fast_fail:
+                    break
 
         # Any unhandled exceptions are probably fatal
         except:
             LOGGER.exception(_("Unable to calculate file hashes for %s"), self)
             raise
 
-        for rel_path, f_hashes, hashes in hash_results:
-            for alg, computed_hash in f_hashes.items():
-                stored_hash = hashes[alg]
-                if stored_hash.lower() != computed_hash:
-                    e = ChecksumMismatch(
-                        rel_path, alg, stored_hash.lower(), computed_hash
-                    )
-                    LOGGER.warning(str(e))
-                    errors.append(e)
+        finally:
+            if pool is not None:
+                # If fast_fail stopped early this discards the pending work
+                # and otherwise every task has already completed:
+                pool.terminate()
+                pool.join()
 
         if errors:
             raise BagValidationError(_("Bag validation failed"), errors)
@@ -922,11 +1015,17 @@ class Bag(object):
                     _("bagit.txt must not contain a byte-order mark")
                 )
 
-    def _path_is_dangerous(self, path):
+    def _real_bag_path(self):
+        return os.path.normpath(os.path.realpath(self.path))
+
+    def _path_is_dangerous(self, path, bag_path=None):
         """
         Return true if path looks dangerous, i.e. potentially operates
         outside the bagging directory structure, e.g. ~/.bashrc, ../../../secrets.json,
         \\\\?\\c:\\, D:\\sys32\\cmd.exe
+
+        Callers checking many paths should pass bag_path from _real_bag_path()
+        so the bag directory is only resolved once.
         """
         if os.path.isabs(path):
             return True
@@ -936,8 +1035,8 @@ class Bag(object):
             return True
         real_path = os.path.realpath(os.path.join(self.path, path))
         real_path = os.path.normpath(real_path)
-        bag_path = os.path.realpath(self.path)
-        bag_path = os.path.normpath(bag_path)
+        if bag_path is None:
+            bag_path = self._real_bag_path()
         common = os.path.commonprefix((bag_path, real_path))
         return not (common == bag_path)
 
@@ -1073,6 +1172,21 @@ def build_unicode_normalized_lookup_dict(filenames):
     return output
 
 
+@lru_cache(maxsize=None)
+def _empty_hasher(alg):
+    return hashlib.new(alg)
+
+
+def _new_hasher(alg):
+    """
+    Return a new hash object for alg
+
+    Copying an empty hasher is cheaper than looking up and initializing a new
+    one with hashlib.new(), which adds up when hashing many small files.
+    """
+    return _empty_hasher(alg).copy()
+
+
 def get_hashers(algorithms):
     """
     Given a list of algorithm names, return a dictionary of hasher instances
@@ -1090,7 +1204,7 @@ def get_hashers(algorithms):
 
     for alg in algorithms:
         try:
-            hasher = hashlib.new(alg)
+            hasher = _new_hasher(alg)
         except ValueError:
             LOGGER.warning(
                 _("Disabling requested hash algorithm %s: hashlib does not support it"),
@@ -1116,7 +1230,7 @@ def _calc_hashes(args):
     full_path = os.path.join(base_path, rel_path)
 
     # Create a clone of the default empty hash objects:
-    f_hashers = dict((alg, hashlib.new(alg)) for alg in hashes if alg in algorithms)
+    f_hashers = dict((alg, _new_hasher(alg)) for alg in hashes if alg in algorithms)
 
     try:
         f_hashes = _calculate_file_hashes(full_path, f_hashers)
@@ -1131,7 +1245,10 @@ def _calculate_file_hashes(full_path, f_hashers):
     Returns a dictionary of (algorithm, hexdigest) values for the provided
     filename
     """
-    LOGGER.info(_("Verifying checksum for file %s"), full_path)
+    # This runs once per payload file so skip the message lookup unless
+    # the record would actually be emitted:
+    if LOGGER.isEnabledFor(logging.INFO):
+        LOGGER.info(_("Verifying checksum for file %s"), full_path)
 
     try:
         with open(full_path, "rb") as f:
@@ -1151,7 +1268,9 @@ def _calculate_file_hashes(full_path, f_hashers):
 
 
 def _load_tag_file(tag_file_name, encoding="utf-8-sig"):
-    with open_text_file(tag_file_name, "r", encoding=encoding) as tag_file:
+    with open_text_file(
+        tag_file_name, "r", encoding=encoding, buffering=TAG_FILE_BUFFER_SIZE
+    ) as tag_file:
         # Store duplicate tags as list of vals
         # in order of parsing under the same key.
         tags = {}
@@ -1178,20 +1297,22 @@ def _parse_tags(tag_file):
     """
 
     tag_name = None
+    # The pieces of a folded value are collected and joined once rather than
+    # repeatedly concatenated, which is quadratic for very long values:
     tag_value = None
 
     # Line folding is handled by yielding values only after we encounter
     # the start of a new tag, or if we pass the EOF.
-    for num, line in enumerate(tag_file):
+    for line in tag_file:
         # Skip over any empty or blank lines.
         if len(line) == 0 or line.isspace():
             continue
         elif line[0].isspace() and tag_value is not None:  # folded line
-            tag_value += line
+            tag_value.append(line)
         else:
             # Starting a new tag; yield the last one.
             if tag_name:
-                yield (tag_name, tag_value.strip())
+                yield (tag_name, "".join(tag_value).strip())
 
             if ":" not in line:
                 raise BagValidationError(
@@ -1202,13 +1323,13 @@ def _parse_tags(tag_file):
                     }
                 )
 
-            parts = line.strip().split(":", 1)
-            tag_name = parts[0].strip()
-            tag_value = parts[1]
+            tag_name, _sep, first_value = line.strip().partition(":")
+            tag_name = tag_name.strip()
+            tag_value = [first_value]
 
     # Passed the EOF.  All done after this.
     if tag_name:
-        yield (tag_name, tag_value.strip())
+        yield (tag_name, "".join(tag_value).strip())
 
 
 def _make_tag_file(bag_info_path, bag_info):
@@ -1233,7 +1354,11 @@ def make_manifests(data_dir, processes, algorithms=DEFAULT_CHECKSUMS, encoding="
     manifest_line_generator = partial(generate_manifest_lines, algorithms=algorithms)
 
     if processes > 1:
-        pool = multiprocessing.Pool(processes=processes)
+        # hashlib releases the GIL while hashing each block, as does reading
+        # the file, so threads hash in parallel without forking or pickling.
+        # Updates smaller than about 2 KiB keep the GIL, so small files are
+        # mostly hashed one at a time:
+        pool = ThreadPool(processes=processes)
         checksums = pool.map(manifest_line_generator, _walk(data_dir))
         pool.close()
         pool.join()
@@ -1254,7 +1379,12 @@ def make_manifests(data_dir, processes, algorithms=DEFAULT_CHECKSUMS, encoding="
     for algorithm, values in manifest_data.items():
         manifest_filename = "manifest-%s.txt" % algorithm
 
-        with open_text_file(manifest_filename, "w", encoding=encoding) as manifest:
+        with open_text_file(
+            manifest_filename,
+            "w",
+            encoding=encoding,
+            buffering=TAG_FILE_BUFFER_SIZE,
+        ) as manifest:
             for digest, filename, byte_count in values:
                 manifest.write("%s  %s\n" % (digest, _encode_filename(filename)))
                 num_files[algorithm] += 1
@@ -1278,27 +1408,41 @@ def make_manifests(data_dir, processes, algorithms=DEFAULT_CHECKSUMS, encoding="
 
 
 def _make_tagmanifest_file(alg, bag_dir, encoding="utf-8"):
-    tagmanifest_file = os.path.join(bag_dir, "tagmanifest-%s.txt" % alg)
-    LOGGER.info(_("Creating %s"), tagmanifest_file)
+    _make_tagmanifest_files([alg], bag_dir, encoding=encoding)
+
+
+def _make_tagmanifest_files(algorithms, bag_dir, encoding="utf-8"):
+    # For performance we'll read each tag file only once and pass it block by
+    # block to every requested hash algorithm:
+    checksums = dict((alg, []) for alg in algorithms)
 
-    checksums = []
     for f in _find_tag_files(bag_dir):
-        if re.match(r"^tagmanifest-.+\.txt$", f):
+        match = MANIFEST_FILENAME_RE.match(f)
+        if match and match.group(1):
             continue
+        hashers = dict((alg, _new_hasher(alg)) for alg in checksums)
         with open(os.path.join(bag_dir, f), "rb") as fh:
-            m = hashlib.new(alg)
             while True:
                 block = fh.read(HASH_BLOCK_SIZE)
                 if not block:
                     break
-                m.update(block)
-            checksums.append((m.hexdigest(), f))
+                for hasher in hashers.values():
+                    hasher.update(block)
+        for alg, hasher in hashers.items():
+            checksums[alg].append((hasher.hexdigest(), f))
 
-    with open_text_file(
-        os.path.join(bag_dir, tagmanifest_file), mode="w", encoding=encoding
-    ) as tagmanifest:
-        for digest, filename in checksums:
-            tagmanifest.write("%s %s\n" % (digest, filename))
+    for alg, alg_checksums in checksums.items():
+        tagmanifest_file = os.path.join(bag_dir, "tagmanifest-%s.txt" % alg)
+        LOGGER.info(_("Creating %s"), tagmanifest_file)
+
+        with open_text_file(
+            os.path.join(bag_dir, tagmanifest_file),
+            mode="w",
+            encoding=encoding,
+            buffering=TAG_FILE_BUFFER_SIZE,
+        ) as tagmanifest:
+            for digest, filename in alg_checksums:
+                tagmanifest.write("%s %s\n" % (digest, filename))
 
 
 def _find_tag_files(bag_dir):
@@ -1374,7 +1518,8 @@ def _can_read(test_dir):
 
 
 def generate_manifest_lines(filename, algorithms=DEFAULT_CHECKSUMS):
-    LOGGER.info(_("Generating manifest lines for file %s"), filename)
+    if LOGGER.isEnabledFor(logging.INFO):
+        LOGGER.info(_("Generating manifest lines for file %s"), filename)
 
     # For performance we'll read the file only once and pass it block
     # by block to every requested hash algorithm:
@@ -7,8 +7,10 @@ from NASA for use in bagging the first time it is run.
 """
 
 import ftplib
+import hashlib
 import os
 import shutil
+import ssl
 import timeit
 
 import bagit
@@ -32,6 +34,14 @@ if not os.path.isdir("bench-data"):
         fh.close()
 
 
+# hashing throughput depends heavily on which implementation hashlib picked for
+# each algorithm: _hashlib.HASH is OpenSSL's (which selects CPU-specific code
+# such as SHA-NI at runtime) while anything else is a builtin fallback:
+for alg in bagit.DEFAULT_CHECKSUMS:
+    hasher_type = type(hashlib.new(alg))
+    print("hashlib %s: %s.%s" % (alg, hasher_type.__module__, hasher_type.__name__))
+print("ssl module built with %s" % ssl.OPENSSL_VERSION)
+
 # create bags using 1-8 processes
 
 statement = """
@@ -19,12 +19,22 @@ def get_message_catalogs():
     for po_file in glob.glob("locale/*/LC_MESSAGES/bagit-python.po"):
         mo_file = po_file.replace(".po", ".mo")
 
-        if not os.path.exists(mo_file) or os.path.getmtime(mo_file) < os.path.getmtime(
-            po_file
-        ):
+        try:
+            mo_mtime = os.path.getmtime(mo_file)
+        except OSError:
+            mo_mtime = None
+
+        if mo_mtime is None or mo_mtime < os.path.getmtime(po_file):
+            # msgfmt writes to a temporary file which is only renamed into place
+            # once complete so an interrupted build can't leave a truncated
+            # catalog which is newer than its source:
+            tmp_mo_file = mo_file + ".tmp"
             try:
-                subprocess.check_call(["msgfmt", "-o", mo_file, po_file])
+                subprocess.check_call(["msgfmt", "-o", tmp_mo_file, po_file])
+                os.replace(tmp_mo_file, mo_file)
             except (OSError, subprocess.CalledProcessError) as exc:
+                if os.path.exists(tmp_mo_file):
+                    os.unlink(tmp_mo_file)
                 print(
                     "Translation catalog %s could not be compiled (is gettext installed?) "
                     " — translations will not be available for this language: %s"
@@ -49,7 +59,6 @@ setup(
     data_files=get_message_catalogs(),
     description=description,
     platforms=["POSIX"],
-    setup_requires=["setuptools_scm"],
     classifiers=[
         "License :: Public Domain",
         "Intended Audience :: Developers",